@@ -0,0 +1,166 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import logging
+import threading
+import time
+from flight_catalog import FlightCatalog
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogDialog(tk.Toplevel):
+    """
+    A window for browsing a flight catalog and opening flights from it.
+    Lists all indexed flights, or only those passing within a radius of a
+    point, and calls on_open with the path of the flight double-clicked.
+    """
+    COLUMNS = (
+        ('path', "File", 360),
+        ('frame_count', "Frames", 70),
+        ('malformed_lines', "Malformed", 80),
+        ('bbox', "Bounding box (X / Y / Z)", 300),
+        ('state', "State", 120),
+    )
+
+    def __init__(self, parent, on_open, db_path=None):
+        super().__init__(parent)
+        self.title("Flight Catalog")
+        self.geometry("900x500")
+        self.on_open = on_open
+        self.catalog = None
+
+        top = ttk.Frame(self, padding="5")
+        top.pack(fill=tk.X)
+        ttk.Button(top, text="Open Catalog...", command=self.do_choose_catalog).pack(side=tk.LEFT)
+        self.scan_button = ttk.Button(top, text="Scan Directory...", command=self.do_scan_directory)
+        self.scan_button.pack(side=tk.LEFT, padx=5)
+        self.catalog_label = ttk.Label(top, text="No catalog open.")
+        self.catalog_label.pack(side=tk.LEFT, padx=5)
+
+        query_frame = ttk.LabelFrame(self, text="Passing within R of point P", padding="5")
+        query_frame.pack(fill=tk.X, padx=5)
+        self.query_vars = [tk.DoubleVar(value=0.0) for _ in range(4)]
+        for i, label in enumerate(["X", "Y", "Z", "R"]):
+            ttk.Label(query_frame, text=f"{label}:").pack(side=tk.LEFT)
+            ttk.Entry(query_frame, textvariable=self.query_vars[i], width=10).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Button(query_frame, text="Search", command=self.do_query).pack(side=tk.LEFT)
+        ttk.Button(query_frame, text="Show All", command=self.do_show_all).pack(side=tk.LEFT, padx=5)
+
+        tree_frame = ttk.Frame(self, padding="5")
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(tree_frame, columns=[c[0] for c in self.COLUMNS], show='headings')
+        for name, heading, width in self.COLUMNS:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, anchor=tk.W)
+        v_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=v_scrollbar.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        v_scrollbar.grid(row=0, column=1, sticky="ns")
+        tree_frame.grid_rowconfigure(0, weight=1)
+        tree_frame.grid_columnconfigure(0, weight=1)
+        self.tree.bind('<Double-1>', self.on_double_click)
+
+        self.status_var = tk.StringVar(value="Double-click a flight to open it.")
+        ttk.Label(self, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W, padding="2").pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        if db_path:
+            self._open_catalog(db_path)
+
+    def _open_catalog(self, db_path):
+        if self.catalog:
+            self.catalog.close()
+        try:
+            self.catalog = FlightCatalog(db_path)
+        except Exception as e:
+            self.catalog = None
+            messagebox.showerror("Catalog Error", f"Could not open catalog: {e}", parent=self)
+            return
+        self.catalog_label.config(text=db_path)
+        self.do_show_all()
+
+    def do_choose_catalog(self):
+        db_path = filedialog.asksaveasfilename(
+            parent=self, title="Open or Create a Flight Catalog", confirmoverwrite=False,
+            defaultextension=".sqlite", filetypes=[("Flight catalogs", "*.sqlite"), ("All files", "*.*")]
+        )
+        if db_path:
+            self._open_catalog(db_path)
+
+    def do_scan_directory(self):
+        if not self.catalog:
+            messagebox.showwarning("Catalog", "Open or create a catalog first.", parent=self)
+            return
+        directory = filedialog.askdirectory(parent=self, title="Select a Directory of Flight Files")
+        if not directory:
+            return
+        self.status_var.set(f"Scanning {directory}...")
+        self.scan_button.config(state=tk.DISABLED)
+        thread = threading.Thread(target=self._scan_task, args=(self.catalog.db_path, directory))
+        thread.daemon = True
+        thread.start()
+
+    def _scan_task(self, db_path, directory):
+        # sqlite connections cannot be shared between threads, so the scan uses its own.
+        try:
+            catalog = FlightCatalog(db_path)
+            try:
+                counts = catalog.update([directory])
+            finally:
+                catalog.close()
+            message = ', '.join(f"{count} {name}" for name, count in counts.items())
+        except Exception as e:
+            logger.error(f"Catalog scan failed: {e}")
+            message = f"Scan failed: {e}"
+        try:
+            self.after(0, self._on_scan_finished, message)
+        except (RuntimeError, tk.TclError):
+            pass  # The dialog was closed during the scan
+
+    def _on_scan_finished(self, message):
+        self.scan_button.config(state=tk.NORMAL)
+        self.do_show_all()
+        self.status_var.set(message)
+
+    def _show(self, flights, check_stale=False):
+        self.tree.delete(*self.tree.get_children())
+        for flight in flights:
+            if flight['frame_count']:
+                bbox = (f"{flight['min_x']:.1f}..{flight['max_x']:.1f} / {flight['min_y']:.1f}..{flight['max_y']:.1f}"
+                        f" / {flight['min_z']:.1f}..{flight['max_z']:.1f}")
+            else:
+                bbox = ""
+            # Only search results are checked, to keep listing a large catalog fast
+            state = "Changed since indexed" if check_stale and FlightCatalog.is_stale(flight) else ""
+            self.tree.insert('', tk.END, iid=flight['path'],
+                             values=(flight['path'], flight['frame_count'], flight['malformed_lines'], bbox, state))
+
+    def do_show_all(self):
+        if not self.catalog:
+            return
+        flights = self.catalog.flights()
+        self._show(flights)
+        self.status_var.set(f"{len(flights)} flights in catalog.")
+
+    def do_query(self):
+        if not self.catalog:
+            return
+        try:
+            x, y, z, radius = (var.get() for var in self.query_vars)
+        except tk.TclError:
+            messagebox.showerror("Search", "X, Y, Z and R must be numbers.", parent=self)
+            return
+        started = time.time()
+        flights = self.catalog.query_near((x, y, z), radius)
+        self._show(flights, check_stale=True)
+        self.status_var.set(f"{len(flights)} flights found in {(time.time() - started) * 1000:.0f} ms.")
+
+    def on_double_click(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self.on_open(selection[0])
+
+    def on_closing(self):
+        if self.catalog:
+            self.catalog.close()
+        self.destroy()
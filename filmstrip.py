@@ -0,0 +1,332 @@
+import tkinter as tk
+from tkinter import ttk
+import logging
+import math
+import threading
+import time
+from PIL import Image, ImageTk
+
+logger = logging.getLogger(__name__)
+
+
+def _coarse_to_fine(count):
+    """Yields slot indices so that the whole range is covered coarsely first, then refined."""
+    stride = 1
+    while stride * 2 < count:
+        stride *= 2
+    seen = set()
+    while stride >= 1:
+        for slot in range(0, count, stride):
+            if slot not in seen:
+                seen.add(slot)
+                yield slot
+        stride //= 2
+
+
+class ThumbnailAtlas:
+    """
+    Stores thumbnails for a flight as a mipmap pyramid of shared atlas images.
+    Level 0 holds tiles of tile_size; every further level halves the tile
+    size. Each level is a single PIL image laid out as a grid of tiles, so
+    the whole filmstrip costs a handful of images instead of one per frame.
+    """
+    def __init__(self, slot_count, tile_size=(64, 48), levels=4, columns=64, background=(32, 32, 32)):
+        self.slot_count = slot_count
+        self.tile_size = tile_size
+        self.levels = levels
+        self.columns = columns
+        self.rows = max(1, math.ceil(slot_count / columns))
+        self.filled = bytearray(slot_count)
+        self._lock = threading.Lock()
+        self._pyramid = []
+        for level in range(levels):
+            w, h = self.level_tile_size(level)
+            self._pyramid.append(Image.new('RGB', (w * columns, h * self.rows), background))
+        self.background = background
+
+    def level_tile_size(self, level):
+        """Returns the (width, height) of a tile at the given mipmap level."""
+        return max(1, self.tile_size[0] >> level), max(1, self.tile_size[1] >> level)
+
+    def _tile_box(self, level, slot):
+        w, h = self.level_tile_size(level)
+        col, row = slot % self.columns, slot // self.columns
+        return col * w, row * h, (col + 1) * w, (row + 1) * h
+
+    def has(self, slot):
+        """Returns True if a thumbnail has been stored for the slot."""
+        return 0 <= slot < self.slot_count and bool(self.filled[slot])
+
+    def add(self, slot, image):
+        """Scales the image into the slot's tile on every level of the pyramid."""
+        if not 0 <= slot < self.slot_count:
+            return
+        tile = Image.new('RGB', self.tile_size, self.background)
+        thumb = image.convert('RGB')
+        thumb.thumbnail(self.tile_size, Image.Resampling.BILINEAR)
+        tile.paste(thumb, ((self.tile_size[0] - thumb.width) // 2, (self.tile_size[1] - thumb.height) // 2))
+        with self._lock:
+            for level in range(self.levels):
+                if level > 0:
+                    tile = tile.resize(self.level_tile_size(level), Image.Resampling.BOX)
+                self._pyramid[level].paste(tile, self._tile_box(level, slot)[:2])
+            self.filled[slot] = 1
+
+    def get_tile(self, level, slot):
+        """Returns a copy of the tile for the slot at the given level."""
+        with self._lock:
+            return self._pyramid[level].crop(self._tile_box(level, slot))
+
+    def compose_strip(self, level, first_slot, count):
+        """Returns a single image with count consecutive tiles from the given level."""
+        w, h = self.level_tile_size(level)
+        strip = Image.new('RGB', (w * count, h), self.background)
+        with self._lock:
+            atlas = self._pyramid[level]
+            for i in range(count):
+                slot = first_slot + i
+                if slot >= self.slot_count:
+                    break
+                if self.filled[slot]:
+                    strip.paste(atlas.crop(self._tile_box(level, slot)), (i * w, 0))
+        return strip
+
+
+class FilmstripView(ttk.Frame):
+    """
+    A timeline of thumbnails for the loaded FlightSequence.
+    Thumbnails for every step-th frame are kept in a ThumbnailAtlas and the
+    visible part of the timeline is drawn as one PhotoImage. The mouse wheel
+    zooms between mipmap levels, Shift+wheel scrolls and clicking a
+    thumbnail calls on_select with its frame index.
+    """
+    def __init__(self, parent, on_select=None, max_thumbnails=2048, tile_size=(64, 48), levels=4):
+        super().__init__(parent)
+        self.on_select = on_select
+        self.max_thumbnails = max_thumbnails
+        self.tile_size = tile_size
+        self.levels = levels
+
+        self.atlas = None
+        self.step = 1
+        self.level = 1
+        self.first_slot = 0
+        self.current_frame = 0
+        self.hover_slot = None
+        self._redraw_job = None
+        self._strip_image = None
+        self._generation = 0
+        self._fill_generation = None
+        self._fill_thread = None
+
+        self.canvas = tk.Canvas(self, height=tile_size[1] + 4, background='#202020', highlightthickness=0)
+        self.canvas.pack(fill=tk.X)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.xview)
+        self.scrollbar.pack(fill=tk.X)
+        self.hover_label = ttk.Label(self, text="")
+        self.hover_label.pack(anchor=tk.W)
+
+        self.canvas.bind('<Configure>', lambda e: self.schedule_redraw())
+        self.canvas.bind('<Motion>', self.on_hover)
+        self.canvas.bind('<Leave>', self.on_leave)
+        self.canvas.bind('<Button-1>', self.on_click)
+        self.canvas.bind('<MouseWheel>', self.on_wheel)
+        self.canvas.bind('<Shift-MouseWheel>', self.on_shift_wheel)
+        # X11 reports the wheel as buttons 4 and 5
+        self.canvas.bind('<Button-4>', lambda e: self._zoom(-1))
+        self.canvas.bind('<Button-5>', lambda e: self._zoom(1))
+        self.canvas.bind('<Shift-Button-4>', lambda e: self._scroll(-self._visible_slots() // 2))
+        self.canvas.bind('<Shift-Button-5>', lambda e: self._scroll(self._visible_slots() // 2))
+
+    def load(self, flight_sequence):
+        """Resets the filmstrip for a new flight sequence."""
+        self._generation += 1
+        frame_count = flight_sequence.get_frame_count() if flight_sequence else 0
+        if frame_count == 0:
+            self.atlas = None
+        else:
+            self.step = max(1, math.ceil(frame_count / self.max_thumbnails))
+            self.atlas = ThumbnailAtlas(math.ceil(frame_count / self.step), self.tile_size, self.levels)
+            logger.info(f"Filmstrip holds {self.atlas.slot_count} thumbnails (every {self.step} frame(s)).")
+        self.first_slot = 0
+        self.current_frame = 0
+        self.hover_slot = None
+        self.hover_label.config(text="")
+        self.schedule_redraw()
+
+    def add_frame_image(self, frame_index, image):
+        """Stores a rendered frame as a thumbnail if the frame has a slot in the filmstrip."""
+        atlas = self.atlas
+        if atlas is None or image is None or frame_index % self.step:
+            return
+        slot = frame_index // self.step
+        if atlas.has(slot):
+            return
+        atlas.add(slot, image)
+        self.schedule_redraw()
+
+    def set_current_frame(self, frame_index):
+        """Moves the current-frame marker, scrolling it into view if needed."""
+        self.current_frame = frame_index
+        if self.atlas is not None:
+            slot = frame_index // self.step
+            visible = self._visible_slots()
+            if not self.first_slot <= slot < self.first_slot + visible:
+                self.first_slot = max(0, slot - visible // 2)
+        self.schedule_redraw()
+
+    def start_background_fill(self, render_func, is_idle):
+        """
+        Starts filling missing thumbnails in a background thread.
+        render_func(frame_index) should return an image or None and is only
+        called while is_idle() returns True, so live renders come first.
+        """
+        if self.atlas is None:
+            return
+        generation = self._generation
+        if self._fill_thread and self._fill_thread.is_alive() and self._fill_generation == generation:
+            return
+        self._fill_generation = generation
+        self._fill_thread = threading.Thread(target=self._fill_loop, args=(generation, render_func, is_idle))
+        self._fill_thread.daemon = True
+        self._fill_thread.start()
+
+    def stop(self):
+        """Stops any background fill and pending redraw."""
+        self._generation += 1
+        if self._redraw_job:
+            self.after_cancel(self._redraw_job)
+            self._redraw_job = None
+
+    def _fill_loop(self, generation, render_func, is_idle):
+        atlas = self.atlas
+        for slot in _coarse_to_fine(atlas.slot_count):
+            while generation == self._generation and not is_idle():
+                time.sleep(0.2)
+            if generation != self._generation:
+                return
+            if atlas.has(slot):
+                continue
+            try:
+                image = render_func(slot * self.step)
+            except Exception as e:
+                logger.error(f"Filmstrip render of frame {slot * self.step} failed: {e}")
+                image = None
+            if image is None:
+                time.sleep(0.2)
+                continue
+            if generation != self._generation:
+                return
+            atlas.add(slot, image)
+            self.schedule_redraw()
+        logger.info("Filmstrip background fill complete.")
+
+    def _visible_slots(self):
+        tile_w = self.atlas.level_tile_size(self.level)[0] if self.atlas else self.tile_size[0]
+        return max(1, self.canvas.winfo_width() // tile_w)
+
+    def schedule_redraw(self):
+        """Coalesces redraw requests into one redraw on the Tk event loop."""
+        if self._redraw_job is None:
+            try:
+                self._redraw_job = self.after(50, self._redraw)
+            except (RuntimeError, tk.TclError):
+                self._redraw_job = None
+
+    def _redraw(self):
+        self._redraw_job = None
+        self.canvas.delete('all')
+        if self.atlas is None:
+            self.scrollbar.set(0.0, 1.0)
+            return
+
+        tile_w, tile_h = self.atlas.level_tile_size(self.level)
+        visible = self._visible_slots()
+        self.first_slot = max(0, min(self.first_slot, self.atlas.slot_count - visible))
+        count = min(visible, self.atlas.slot_count - self.first_slot)
+        top = (int(self.canvas['height']) - tile_h) // 2
+
+        self._strip_image = ImageTk.PhotoImage(self.atlas.compose_strip(self.level, self.first_slot, count))
+        self.canvas.create_image(0, top, image=self._strip_image, anchor=tk.NW)
+
+        current_slot = self.current_frame // self.step - self.first_slot
+        if 0 <= current_slot < count:
+            x = current_slot * tile_w
+            self.canvas.create_rectangle(x, top, x + tile_w - 1, top + tile_h - 1, outline='#ffcc00', width=2)
+        self.canvas.create_rectangle(0, 0, 0, 0, outline='#ffffff', tags='hover', state=tk.HIDDEN)
+        self._update_hover_marker()
+
+        total = self.atlas.slot_count
+        self.scrollbar.set(self.first_slot / total, (self.first_slot + count) / total)
+
+    def _slot_at(self, x):
+        if self.atlas is None:
+            return None
+        slot = self.first_slot + int(x) // self.atlas.level_tile_size(self.level)[0]
+        return slot if 0 <= slot < self.atlas.slot_count else None
+
+    def _update_hover_marker(self):
+        if self.hover_slot is None or self.atlas is None:
+            self.canvas.itemconfigure('hover', state=tk.HIDDEN)
+            return
+        tile_w, tile_h = self.atlas.level_tile_size(self.level)
+        top = (int(self.canvas['height']) - tile_h) // 2
+        x = (self.hover_slot - self.first_slot) * tile_w
+        self.canvas.coords('hover', x, top, x + tile_w - 1, top + tile_h - 1)
+        self.canvas.itemconfigure('hover', state=tk.NORMAL)
+
+    def on_hover(self, event):
+        slot = self._slot_at(event.x)
+        if slot == self.hover_slot:
+            return
+        self.hover_slot = slot
+        self._update_hover_marker()
+        if slot is None:
+            self.hover_label.config(text="")
+        else:
+            state = "" if self.atlas.has(slot) else " (not rendered yet)"
+            self.hover_label.config(text=f"Frame {slot * self.step + 1}{state}")
+
+    def on_leave(self, event):
+        self.hover_slot = None
+        self._update_hover_marker()
+        self.hover_label.config(text="")
+
+    def on_click(self, event):
+        slot = self._slot_at(event.x)
+        if slot is not None and self.on_select:
+            self.on_select(slot * self.step)
+
+    def on_wheel(self, event):
+        self._zoom(-1 if event.delta > 0 else 1)
+
+    def on_shift_wheel(self, event):
+        self._scroll((-1 if event.delta > 0 else 1) * (self._visible_slots() // 2))
+
+    def _zoom(self, direction):
+        """Switches mipmap level, keeping the slot under the centre of the view in place."""
+        level = max(0, min(self.levels - 1, self.level + direction))
+        if self.atlas is None or level == self.level:
+            return
+        centre = self.first_slot + self._visible_slots() // 2
+        self.level = level
+        self.first_slot = max(0, centre - self._visible_slots() // 2)
+        self.schedule_redraw()
+
+    def _scroll(self, slots):
+        if self.atlas is None:
+            return
+        self.first_slot = max(0, self.first_slot + slots)
+        self.schedule_redraw()
+
+    def xview(self, *args):
+        """Scrollbar callback implementing the standard moveto/scroll protocol."""
+        if self.atlas is None or not args:
+            return
+        if args[0] == 'moveto':
+            self.first_slot = int(float(args[1]) * self.atlas.slot_count)
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            self.first_slot += amount * (self._visible_slots() if args[2] == 'pages' else 1)
+        self.first_slot = max(0, self.first_slot)
+        self.schedule_redraw()
@@ -0,0 +1,371 @@
+import argparse
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from flight_parser import FlightSequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXTENSIONS = ('.fli', '.flb')
+
+# Positions are indexed in segments of SEGMENT_FRAMES consecutive frames.
+# Segment ids encode the owning flight as id >> SEGMENT_ID_BITS.
+SEGMENT_FRAMES = 64
+SEGMENT_ID_BITS = 20
+
+# Bumped whenever the tables change; older catalogs are rebuilt on open.
+SCHEMA_VERSION = 3
+
+# Scan results are committed in batches of this many files, so an
+# interrupted scan of a large library keeps most of its progress.
+COMMIT_EVERY = 500
+
+STAT_COLUMNS = (
+    'frame_count', 'malformed_lines',
+    'min_x', 'max_x', 'min_y', 'max_y', 'min_z', 'max_z',
+    'min_yaw', 'max_yaw', 'min_pitch', 'max_pitch', 'min_roll', 'max_roll',
+)
+
+
+def _file_hash(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _init_worker():
+    # A library of hand-edited files can produce a warning per malformed
+    # line; the count is recorded in the index instead.
+    logging.getLogger('flight_parser').setLevel(logging.CRITICAL)
+
+
+def scan_flight_file(task):
+    """
+    Hashes and parses one flight file and returns its catalog record.
+    task is (path, known_hash); if the hash still matches, parsing is skipped.
+    Runs in a worker process.
+    """
+    path, known_hash = task
+    try:
+        st = os.stat(path)
+        record = {'path': path, 'mtime': st.st_mtime, 'size': st.st_size, 'sha256': _file_hash(path)}
+    except OSError as e:
+        return {'path': path, 'error': str(e)}
+    if record['sha256'] == known_hash:
+        record['unchanged'] = True
+        return record
+
+    sequence = FlightSequence(path)
+    try:
+        count = sequence.get_frame_count()
+        record['format'] = 'binary' if sequence.is_binary else 'text'
+        record['frame_count'] = count
+        record['malformed_lines'] = sequence.malformed_lines
+        lows = [math.inf] * 6
+        highs = [-math.inf] * 6
+        segments = []
+        segment_points = []
+        for start in range(0, count, SEGMENT_FRAMES):
+            seg_low = [math.inf] * 3
+            seg_high = [-math.inf] * 3
+            points = array('d')
+            for params in sequence.frames[start:start + SEGMENT_FRAMES]:
+                points.extend(params[:3])
+                for i, value in enumerate(params):
+                    if value < lows[i]:
+                        lows[i] = value
+                    if value > highs[i]:
+                        highs[i] = value
+                    if i < 3:
+                        if value < seg_low[i]:
+                            seg_low[i] = value
+                        if value > seg_high[i]:
+                            seg_high[i] = value
+            segments.append((seg_low[0], seg_high[0], seg_low[1], seg_high[1], seg_low[2], seg_high[2]))
+            segment_points.append(_pack_points(points))
+        for i, name in enumerate(('x', 'y', 'z', 'yaw', 'pitch', 'roll')):
+            record[f'min_{name}'] = lows[i] if count else None
+            record[f'max_{name}'] = highs[i] if count else None
+        record['segments'] = segments
+        record['segment_points'] = segment_points
+    finally:
+        sequence.close()
+    return record
+
+
+def _pack_points(points):
+    """Serialises an array('d') of x, y, z positions as little-endian float64."""
+    if sys.byteorder != 'little':
+        points.byteswap()
+    return points.tobytes()
+
+
+def _unpack_points(blob):
+    points = array('d')
+    points.frombytes(blob)
+    if sys.byteorder != 'little':
+        points.byteswap()
+    return points
+
+
+def _distance_to_box(point, box):
+    """Returns the distance from point to an axis-aligned box (min_x, max_x, min_y, max_y, min_z, max_z)."""
+    total = 0.0
+    for i, p in enumerate(point):
+        low, high = box[2 * i], box[2 * i + 1]
+        d = low - p if p < low else p - high if p > high else 0.0
+        total += d * d
+    return math.sqrt(total)
+
+
+class FlightCatalog:
+    """
+    A persistent SQLite index of flight files.
+    Each file gets one row of summary statistics. Its positions are also
+    indexed as bounding boxes of SEGMENT_FRAMES-frame segments, stored in an
+    R*Tree when SQLite supports it, and the positions of every segment are
+    kept at full float64 precision so proximity queries never re-read the
+    flight files and give the same answer they would.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self._create_schema()
+
+    def _create_schema(self):
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Older catalogs lack segment positions or store them as float32; drop them so the next scan rebuilds everything.
+            for table in ('flights', 'segments', 'segment_points'):
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        stat_columns = ', '.join(f'{name} {"INTEGER" if name in ("frame_count", "malformed_lines") else "REAL"}'
+                                 for name in STAT_COLUMNS)
+        self.conn.execute(f"""CREATE TABLE IF NOT EXISTS flights (
+            id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL,
+            mtime REAL, size INTEGER, sha256 TEXT, format TEXT,
+            segment_count INTEGER, indexed_at REAL,
+            {stat_columns})""")
+        try:
+            self.conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS segments
+                USING rtree(id, min_x, max_x, min_y, max_y, min_z, max_z)""")
+        except sqlite3.OperationalError:
+            logger.warning("SQLite has no R*Tree support; falling back to a plain segment table.")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS segments (
+                id INTEGER PRIMARY KEY, min_x REAL, max_x REAL, min_y REAL, max_y REAL, min_z REAL, max_z REAL)""")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS segment_points (id INTEGER PRIMARY KEY, points BLOB)")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def discover(directories, extensions=DEFAULT_EXTENSIONS):
+        """Returns the absolute paths of all flight files below the given directories."""
+        paths = []
+        for directory in directories:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.lower().endswith(extensions):
+                        paths.append(os.path.abspath(os.path.join(root, name)))
+        return paths
+
+    def update(self, directories, extensions=DEFAULT_EXTENSIONS, workers=None):
+        """
+        Brings the index up to date with the flight files below directories.
+        Files whose mtime and size are unchanged are skipped without being
+        read; changed files are re-hashed and only re-parsed if the hash
+        differs. Entries for files that no longer exist are removed.
+        Returns a dict of counts.
+        """
+        started = time.time()
+        roots = [os.path.abspath(d) for d in directories]
+        paths = self.discover(roots, extensions)
+        known = {row['path']: row for row in self.conn.execute("SELECT id, path, mtime, size, sha256 FROM flights")}
+
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        tasks = []
+        for path in paths:
+            row = known.get(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if row is not None and row['mtime'] == st.st_mtime and row['size'] == st.st_size:
+                counts['unchanged'] += 1
+                continue
+            tasks.append((path, row['sha256'] if row is not None else None))
+
+        if tasks:
+            logger.info(f"Scanning {len(tasks)} flight file(s)...")
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                for done, record in enumerate(pool.map(scan_flight_file, tasks, chunksize=16), 1):
+                    if 'error' in record:
+                        logger.warning(f"Could not index {record['path']}: {record['error']}")
+                        counts['failed'] += 1
+                    elif record.get('unchanged'):
+                        self.conn.execute("UPDATE flights SET mtime = ?, size = ? WHERE path = ?",
+                                          (record['mtime'], record['size'], record['path']))
+                        counts['unchanged'] += 1
+                    else:
+                        counts['updated' if record['path'] in known else 'added'] += 1
+                        self._store(record, known.get(record['path']))
+                    if done % COMMIT_EVERY == 0:
+                        self.conn.commit()
+
+        present = set(paths)
+        for path, row in known.items():
+            if path not in present and any(path.startswith(os.path.join(root, '')) for root in roots):
+                self._delete(row)
+                counts['removed'] += 1
+        self.conn.commit()
+        logger.info(f"Catalog updated in {time.time() - started:.2f}s: {counts}")
+        return counts
+
+    def _delete_segments(self, flight_id, segment_count):
+        base = flight_id << SEGMENT_ID_BITS
+        self.conn.executemany("DELETE FROM segments WHERE id = ?", ((base + i,) for i in range(segment_count or 0)))
+        self.conn.execute("DELETE FROM segment_points WHERE id BETWEEN ? AND ?",
+                          (base, base + (1 << SEGMENT_ID_BITS) - 1))
+
+    def _delete(self, row):
+        segment_count = self.conn.execute("SELECT segment_count FROM flights WHERE id = ?", (row['id'],)).fetchone()[0]
+        self._delete_segments(row['id'], segment_count)
+        self.conn.execute("DELETE FROM flights WHERE id = ?", (row['id'],))
+
+    def _store(self, record, existing):
+        segments = record['segments']
+        segment_points = record['segment_points']
+        if len(segments) > 1 << SEGMENT_ID_BITS:
+            # Too long to index segment by segment; fall back to the overall box.
+            segments = [(record['min_x'], record['max_x'], record['min_y'], record['max_y'],
+                         record['min_z'], record['max_z'])]
+            segment_points = [b''.join(segment_points)]
+        values = {name: record[name] for name in STAT_COLUMNS}
+        values.update(path=record['path'], mtime=record['mtime'], size=record['size'], sha256=record['sha256'],
+                      format=record['format'], segment_count=len(segments), indexed_at=time.time())
+        if existing is not None:
+            self._delete(existing)
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        flight_id = self.conn.execute(f"INSERT INTO flights ({columns}) VALUES ({placeholders})",
+                                      tuple(values.values())).lastrowid
+        base = flight_id << SEGMENT_ID_BITS
+        self.conn.executemany("INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              ((base + i, *box) for i, box in enumerate(segments)))
+        self.conn.executemany("INSERT INTO segment_points VALUES (?, ?)",
+                              ((base + i, points) for i, points in enumerate(segment_points)))
+
+    def flights(self, order_by='path'):
+        """Returns all indexed flights as sqlite3.Row objects."""
+        if order_by not in ('path', 'frame_count', 'malformed_lines', 'mtime'):
+            raise ValueError(f"Cannot order flights by {order_by}.")
+        return self.conn.execute(f"SELECT * FROM flights ORDER BY {order_by}").fetchall()
+
+    def get(self, path):
+        """Returns the catalog record for a path, or None."""
+        return self.conn.execute("SELECT * FROM flights WHERE path = ?", (os.path.abspath(path),)).fetchone()
+
+    @staticmethod
+    def is_stale(flight):
+        """Returns True if the file has changed or vanished since it was indexed."""
+        try:
+            st = os.stat(flight['path'])
+        except OSError:
+            return True
+        return st.st_mtime != flight['mtime'] or st.st_size != flight['size']
+
+    def query_near(self, point, radius, exact=True):
+        """
+        Returns flights with at least one frame within radius of point.
+        Candidates come from the segment index. With exact=True the stored
+        positions of matching segments are checked, dropping segments whose
+        bounding box comes near the point but none of whose frames do.
+        Only the index is read; use is_stale() to spot files edited since.
+        """
+        px, py, pz = point
+        rows = self.conn.execute(
+            """SELECT id, min_x, max_x, min_y, max_y, min_z, max_z FROM segments
+               WHERE min_x <= ? AND max_x >= ? AND min_y <= ? AND max_y >= ? AND min_z <= ? AND max_z >= ?""",
+            (px + radius, px - radius, py + radius, py - radius, pz + radius, pz - radius))
+
+        candidates = {}
+        for row in rows:
+            if _distance_to_box(point, tuple(row)[1:]) <= radius:
+                candidates.setdefault(row['id'] >> SEGMENT_ID_BITS, []).append(row['id'])
+
+        results = []
+        for flight_id, segment_ids in candidates.items():
+            if exact and not any(self._segment_passes_within(segment_id, point, radius) for segment_id in segment_ids):
+                continue
+            flight = self.conn.execute("SELECT * FROM flights WHERE id = ?", (flight_id,)).fetchone()
+            if flight is not None:
+                results.append(flight)
+        results.sort(key=lambda r: r['path'])
+        return results
+
+    def _segment_passes_within(self, segment_id, point, radius):
+        row = self.conn.execute("SELECT points FROM segment_points WHERE id = ?", (segment_id,)).fetchone()
+        if row is None:
+            return False
+        points = _unpack_points(row['points'])
+        px, py, pz = point
+        limit = radius * radius
+        for i in range(0, len(points), 3):
+            if (points[i] - px) ** 2 + (points[i + 1] - py) ** 2 + (points[i + 2] - pz) ** 2 <= limit:
+                return True
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and search a library of flight files.")
+    parser.add_argument('--db', default='flight_catalog.sqlite', help="catalog database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan = commands.add_parser('scan', help="index or re-index flight files below directories")
+    scan.add_argument('directories', nargs='+')
+    scan.add_argument('--workers', type=int, default=None, help="number of worker processes")
+
+    near = commands.add_parser('near', help="list flights passing within R of point P")
+    near.add_argument('x', type=float)
+    near.add_argument('y', type=float)
+    near.add_argument('z', type=float)
+    near.add_argument('radius', type=float)
+    near.add_argument('--approximate', action='store_true', help="use segment bounding boxes only")
+
+    commands.add_parser('list', help="list all indexed flights")
+    args = parser.parse_args()
+
+    # Per-file parse messages would drown out the results
+    logging.getLogger('flight_parser').setLevel(logging.ERROR)
+    catalog = FlightCatalog(args.db)
+    try:
+        if args.command == 'scan':
+            counts = catalog.update(args.directories, workers=args.workers)
+            print(', '.join(f"{count} {name}" for name, count in counts.items()))
+            return
+        if args.command == 'near':
+            started = time.time()
+            flights = catalog.query_near((args.x, args.y, args.z), args.radius, exact=not args.approximate)
+            logger.info(f"Query took {(time.time() - started) * 1000:.1f} ms")
+        else:
+            flights = catalog.flights()
+        for flight in flights:
+            stale = "\tchanged since indexed" if catalog.is_stale(flight) else ""
+            print(f"{flight['path']}\t{flight['frame_count']} frames\t{flight['malformed_lines']} malformed{stale}")
+    finally:
+        catalog.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -1,20 +1,185 @@
+import argparse
 import logging
+import mmap
+import struct
+import sys
+import zlib
+from array import array
 
 logger = logging.getLogger(__name__)
 
+# Binary flight file (.flb) layout, all little-endian:
+#   header: magic, version, reserved, record count, CRC32 of the records, padding
+#   records: count x 6 float64 (X Y Z Yaw Pitch Roll)
+# The header is 24 bytes so the records stay 8-byte aligned for mmap.
+BINARY_MAGIC = b'PFLB'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHHQI4x')
+VALUES_PER_FRAME = 6
+RECORD_SIZE = VALUES_PER_FRAME * 8
+
+
+class FlightFileError(Exception):
+    """Raised when a flight file cannot be read, or a binary one is truncated, corrupt or of an unknown version."""
+
+
+class _BinaryFrames:
+    """
+    Read-only list-like view of the frames in a binary flight file.
+    On little-endian hosts it indexes straight into the mmap without copying.
+    """
+    def __init__(self, values, views=()):
+        self._values = values
+        self._views = views
+
+    def __len__(self):
+        return len(self._values) // VALUES_PER_FRAME
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("frame index out of range")
+        start = index * VALUES_PER_FRAME
+        return self._values[start:start + VALUES_PER_FRAME].tolist()
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def release(self):
+        """Releases the buffer views so the underlying mmap can be closed."""
+        for view in (self._values, *self._views):
+            if isinstance(view, memoryview):
+                try:
+                    view.release()
+                except BufferError:
+                    pass  # Still in use by another thread; freed with its last reference
+
+
+def is_binary_flight_file(filepath):
+    """Returns True if the file starts with the binary flight file magic."""
+    with open(filepath, 'rb') as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def write_binary_flight_file(filepath, frames):
+    """Writes frames (sequences of 6 numbers) to a binary flight file."""
+    values = array('d')
+    for params in frames:
+        if len(params) != VALUES_PER_FRAME:
+            raise ValueError(f"Expected {VALUES_PER_FRAME} values per frame, found {len(params)}.")
+        values.extend(params)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    payload = values.tobytes()
+    header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(values) // VALUES_PER_FRAME, zlib.crc32(payload))
+    with open(filepath, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+
+
+def write_text_flight_file(filepath, frames):
+    """Writes frames to a text flight file using lossless float formatting."""
+    with open(filepath, 'w') as f:
+        for params in frames:
+            f.write('start ' + ' '.join(repr(float(p)) for p in params) + '\n')
+
+
+def convert_flight_file(src, dst):
+    """
+    Converts a text flight file to binary or a binary one to text, based on the source format.
+    Raises FlightFileError without touching dst if src cannot be read, has no
+    frames or has malformed lines, so a bad source never yields a partial copy.
+    """
+    sequence = FlightSequence(src)
+    try:
+        if sequence.load_error:
+            raise FlightFileError(f"Cannot read {src}: {sequence.load_error}")
+        if sequence.malformed_lines:
+            raise FlightFileError(f"{src} has {sequence.malformed_lines} malformed lines.")
+        if sequence.get_frame_count() == 0:
+            raise FlightFileError(f"{src} contains no frames.")
+        if sequence.is_binary:
+            write_text_flight_file(dst, sequence.frames)
+        else:
+            write_binary_flight_file(dst, sequence.frames)
+        return sequence.get_frame_count()
+    finally:
+        sequence.close()
+
+
 class FlightSequence:
     """
     Parses and stores a flight sequence from a Pangu flight file.
     The expected format for each line is:
     start X Y Z Yaw Pitch Roll
+    Binary flight files are detected automatically and mapped into memory
+    instead of being parsed.
     """
-    def __init__(self, filepath):
+    def __init__(self, filepath, verify_checksum=True):
         self.filepath = filepath
         self.frames = []
+        self.malformed_lines = 0
+        self.load_error = None
+        self.is_binary = False
+        self.verify_checksum = verify_checksum
+        self._mmap = None
         self._parse()
 
     def _parse(self):
         """Reads the file and parses the frames."""
+        try:
+            self.is_binary = is_binary_flight_file(self.filepath)
+        except OSError as e:
+            logger.error(f"Failed to read or parse flight file {self.filepath}: {e}")
+            self.load_error = e
+            return
+        if self.is_binary:
+            self._load_binary()
+        else:
+            self._parse_text()
+
+        if self.frames:
+            logger.info(f"Successfully parsed {len(self.frames)} frames from {self.filepath}.")
+        else:
+            logger.error(f"No valid frames were parsed from {self.filepath}.")
+
+    def _load_binary(self):
+        """Maps a binary flight file and exposes its records without parsing."""
+        logger.info(f"Mapping binary flight file: {self.filepath}")
+        try:
+            with open(self.filepath, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._mmap) < BINARY_HEADER.size:
+                raise FlightFileError("File is too short for a binary flight header.")
+            _, version, _, count, checksum = BINARY_HEADER.unpack_from(self._mmap)
+            if version != BINARY_VERSION:
+                raise FlightFileError(f"Unsupported binary flight file version {version}.")
+            end = BINARY_HEADER.size + count * RECORD_SIZE
+            if len(self._mmap) < end:
+                raise FlightFileError(f"File is truncated: expected {count} records.")
+
+            records = memoryview(self._mmap)[BINARY_HEADER.size:end]
+            if self.verify_checksum and zlib.crc32(records) != checksum:
+                records.release()
+                raise FlightFileError("Checksum mismatch.")
+            if sys.byteorder == 'little':
+                self.frames = _BinaryFrames(records.cast('d'), (records,))
+            else:
+                values = array('d', records.tobytes())
+                values.byteswap()
+                records.release()
+                self.frames = _BinaryFrames(values)
+        except Exception as e:
+            logger.error(f"Failed to read or parse flight file {self.filepath}: {e}")
+            self.load_error = e
+            self.close()
+
+    def _parse_text(self):
+        """Parses a text flight file line by line."""
         logger.info(f"Parsing flight file: {self.filepath}")
         try:
             with open(self.filepath, 'r') as f:
@@ -28,6 +193,7 @@ class FlightSequence:
                     # A valid line should have 'start' + 6 numeric values
                     if len(parts) != 7:
                         logger.warning(f"Skipping malformed line {i+1} in {self.filepath}: Expected 7 parts, found {len(parts)}.")
+                        self.malformed_lines += 1
                         continue
                     
                     try:
@@ -36,22 +202,57 @@ class FlightSequence:
                         self.frames.append(params)
                     except ValueError:
                         logger.warning(f"Skipping malformed line {i+1} in {self.filepath}: Could not convert parts to float.")
+                        self.malformed_lines += 1
                         continue
         except Exception as e:
             logger.error(f"Failed to read or parse flight file {self.filepath}: {e}")
+            self.load_error = e
             self.frames = []  # Ensure frames list is empty on error
-        
-        if self.frames:
-            logger.info(f"Successfully parsed {len(self.frames)} frames from {self.filepath}.")
-        else:
-            logger.error(f"No valid frames were parsed from {self.filepath}.")
+
+    def close(self):
+        """
+        Releases the memory map of a binary flight file. If another thread is
+        still reading a frame the map cannot be unmapped yet, so it is left
+        for the garbage collector to reclaim.
+        """
+        if isinstance(self.frames, _BinaryFrames):
+            self.frames.release()
+        self.frames = []
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                logger.debug(f"Memory map of {self.filepath} is still in use; leaving it to be reclaimed.")
+            self._mmap = None
 
     def get_frame_count(self):
         """Returns the total number of frames in the sequence."""
         return len(self.frames)
 
     def get_frame(self, index):
-        """Returns the parameters for a specific frame index."""
-        if 0 <= index < len(self.frames):
-            return self.frames[index]
+        """Returns the parameters for a specific frame index, or None if it is out of range or the sequence is closed."""
+        frames = self.frames
+        if 0 <= index < len(frames):
+            try:
+                return frames[index]
+            except ValueError:
+                return None  # Closed by another thread since the length check
         return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert between text (.fli) and binary (.flb) flight files.")
+    parser.add_argument('source', help="flight file to read; its format is detected automatically")
+    parser.add_argument('destination', help="file to write in the other format")
+    args = parser.parse_args()
+    try:
+        count = convert_flight_file(args.source, args.destination)
+    except (FlightFileError, OSError) as e:
+        logger.error(f"Conversion failed: {e}")
+        sys.exit(1)
+    print(f"Converted {count} frames to {args.destination}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,131 @@
+import logging
+import struct
+import threading
+from PIL import ImageFile
+
+logger = logging.getLogger(__name__)
+
+# PANGU encodes unsigned longs on the wire as 4 bytes in network byte order.
+ULONG = struct.Struct('>L')
+
+MIN_BUFFER_SIZE = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class FrameBufferPool:
+    """
+    A pool of preallocated, size-classed receive buffers.
+    Buffer sizes are rounded up to the next power of two (at least
+    MIN_BUFFER_SIZE) so frames of similar size share the same buffers.
+    Released buffers are kept for reuse until the pool holds max_bytes;
+    anything beyond that is dropped, which bounds memory by pool size.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_per_class=4):
+        self.max_bytes = max_bytes
+        self.max_per_class = max_per_class
+        self._free = {}
+        self._pooled_bytes = 0
+        self._lock = threading.Lock()
+        self.allocations = 0
+
+    @staticmethod
+    def size_class(size):
+        """Returns the buffer size used to hold a payload of the given size."""
+        capacity = MIN_BUFFER_SIZE
+        while capacity < size:
+            capacity *= 2
+        return capacity
+
+    def acquire(self, size):
+        """Returns a bytearray of at least size bytes, reusing a pooled one if possible."""
+        capacity = self.size_class(size)
+        with self._lock:
+            free = self._free.get(capacity)
+            if free:
+                self._pooled_bytes -= capacity
+                return free.pop()
+            self.allocations += 1
+        logger.debug(f"Allocating new receive buffer of {capacity} bytes.")
+        return bytearray(capacity)
+
+    def release(self, buf):
+        """Returns a buffer to the pool, or drops it if the pool is full."""
+        capacity = len(buf)
+        with self._lock:
+            free = self._free.setdefault(capacity, [])
+            if len(free) >= self.max_per_class or self._pooled_bytes + capacity > self.max_bytes:
+                return
+            free.append(buf)
+            self._pooled_bytes += capacity
+
+    def pooled_bytes(self):
+        """Returns the number of bytes currently held by idle pooled buffers."""
+        with self._lock:
+            return self._pooled_bytes
+
+    def clear(self):
+        """Drops all idle buffers."""
+        with self._lock:
+            self._free.clear()
+            self._pooled_bytes = 0
+
+
+class FrameReader:
+    """
+    Reads length-prefixed image payloads from a socket into pooled buffers
+    using recv_into, and decodes them with PIL. If incremental is True the
+    image is decoded chunk by chunk while the bytes are still arriving.
+    """
+    def __init__(self, sock, pool, incremental=False):
+        self.sock = sock
+        self.pool = pool
+        self.incremental = incremental
+        self._ulong_buf = bytearray(ULONG.size)
+
+    def _recv_exact(self, view):
+        """Fills the given memoryview completely from the socket."""
+        received = 0
+        total = len(view)
+        while received < total:
+            n = self.sock.recv_into(view[received:], total - received)
+            if n == 0:
+                raise ConnectionError(f"Connection closed after {received} of {total} bytes.")
+            received += n
+
+    def read_ulong(self):
+        """Reads a single unsigned long from the socket."""
+        self._recv_exact(memoryview(self._ulong_buf))
+        return ULONG.unpack(self._ulong_buf)[0]
+
+    def read_image(self):
+        """Reads the size and payload of an image message and returns (image, size)."""
+        size = self.read_ulong()
+        if size == 0:
+            return None, 0
+
+        buf = self.pool.acquire(size)
+        try:
+            with memoryview(buf) as view:
+                parser = ImageFile.Parser()
+                if self.incremental:
+                    received = 0
+                    while received < size:
+                        n = self.sock.recv_into(view[received:size], min(CHUNK_SIZE, size - received))
+                        if n == 0:
+                            raise ConnectionError(f"Connection closed after {received} of {size} bytes.")
+                        received += n
+                        try:
+                            parser.feed(bytes(view[received - n:received]))
+                        except Exception:
+                            # Drain the rest of the payload so the next reply starts on a message header.
+                            self._recv_exact(view[received:size])
+                            raise
+                else:
+                    self._recv_exact(view[:size])
+                    for offset in range(0, size, CHUNK_SIZE):
+                        parser.feed(bytes(view[offset:min(offset + CHUNK_SIZE, size)]))
+                # close() finishes decoding, so the image no longer references buf.
+                image = parser.close()
+        finally:
+            self.pool.release(buf)
+        return image, size
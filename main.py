@@ -4,12 +4,44 @@ import logging
 from PIL import ImageTk, Image
 import threading
 import time
+import os
 from pangu_client import PanguClient
 from flight_parser import FlightSequence
+from filmstrip import FilmstripView
+from catalog_dialog import CatalogDialog
 
 # Setup logging to console
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# The camera position list only holds this many frames around the current
+# one, so even multi-million-frame flights open instantly.
+FRAME_LIST_WINDOW = 1000
+
+DEFAULT_SERVER_IP = '127.0.0.1'
+DEFAULT_SERVER_PORT = 10363
+
+
+def parse_server_address(value):
+    """
+    Parses a host[:port] string such as the PANGU_SERVER variable into (host, port).
+    A missing port falls back to the default; an unusable value is logged and
+    the default server is used instead.
+    """
+    if not value:
+        return DEFAULT_SERVER_IP, DEFAULT_SERVER_PORT
+    host, sep, port = value.strip().rpartition(':')
+    if not sep:
+        return port, DEFAULT_SERVER_PORT
+    try:
+        port = int(port)
+        if not 0 < port < 65536:
+            raise ValueError
+    except ValueError:
+        logging.warning(f"Ignoring PANGU_SERVER={value!r}: expected host:port. Using {DEFAULT_SERVER_IP}:{DEFAULT_SERVER_PORT}.")
+        return DEFAULT_SERVER_IP, DEFAULT_SERVER_PORT
+    return host.strip('[]') or DEFAULT_SERVER_IP, port
+
+
 class PanguClientApp(tk.Tk):
     """The main GUI application window."""
     def __init__(self):
@@ -17,11 +49,11 @@ class PanguClientApp(tk.Tk):
         self.title("Pangu Flight File Editor")
         self.geometry("1400x900")
 
-        # Client instance - using fixed server settings
+        # Client instance - PANGU_SERVER=host:port overrides the default server,
+        # e.g. to connect through render_proxy.py
         self.client = None
         self.current_image = None
-        self.server_ip = '127.0.0.1'
-        self.server_port = '10363'
+        self.server_ip, self.server_port = parse_server_address(os.environ.get('PANGU_SERVER'))
 
         # Flight Sequence data and state
         self.flight_sequence = None
@@ -30,6 +62,8 @@ class PanguClientApp(tk.Tk):
         self.playback_paused = threading.Event()
         self.current_frame_index = tk.IntVar(value=0)
         self.playback_fps = tk.DoubleVar(value=10.0)
+        # Index of the frame shown in the first row of the frame list
+        self.frame_list_offset = 0
         
         # Debounce mechanism for slider
         self.debounce_job = None
@@ -105,7 +139,10 @@ class PanguClientApp(tk.Tk):
         playback_frame.pack(fill=tk.X, pady=5, padx=5)
 
         load_button = ttk.Button(playback_frame, text="Load Flight File...", command=self.do_load_flight_file)
-        load_button.grid(row=0, column=0, columnspan=5, sticky=tk.EW, pady=5)
+        load_button.grid(row=0, column=0, columnspan=3, sticky=tk.EW, pady=5, padx=(0,2))
+
+        catalog_button = ttk.Button(playback_frame, text="Open from Catalog...", command=self.do_open_catalog)
+        catalog_button.grid(row=0, column=3, columnspan=2, sticky=tk.EW, pady=5, padx=(2,0))
 
         self.playback_status_label = ttk.Label(playback_frame, text="No flight file loaded.")
         self.playback_status_label.grid(row=1, column=0, columnspan=5, sticky=tk.W)
@@ -130,8 +167,12 @@ class PanguClientApp(tk.Tk):
         self.frame_slider = ttk.Scale(playback_frame, from_=0, to=0, orient=tk.HORIZONTAL, variable=self.current_frame_index, command=self.on_slider_drag)
         self.frame_slider.grid(row=3, column=0, columnspan=5, sticky=tk.EW, pady=5)
         
+        # Thumbnail timeline of the whole flight, filled in the background
+        self.filmstrip = FilmstripView(playback_frame, on_select=self.on_filmstrip_select)
+        self.filmstrip.grid(row=4, column=0, columnspan=5, sticky=tk.EW, pady=(0, 5))
+
         fps_label_frame = ttk.Frame(playback_frame)
-        fps_label_frame.grid(row=4, column=0, columnspan=5, sticky=tk.EW)
+        fps_label_frame.grid(row=5, column=0, columnspan=5, sticky=tk.EW)
         # ttk.Label(fps_label_frame, text="FPS:").pack(side=tk.LEFT)
         # fps_entry = ttk.Entry(fps_label_frame, textvariable=self.playback_fps, width=5)
         # fps_entry.pack(side=tk.LEFT, padx=5)
@@ -256,27 +297,43 @@ class PanguClientApp(tk.Tk):
         status_bar = ttk.Label(self, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W, padding="2")
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
-    def _populate_frame_list(self):
-        """Populate the listbox with camera positions from the flight sequence."""
+    def _populate_frame_list(self, center_frame=0):
+        """Populate the listbox with the window of camera positions around center_frame."""
         self.frame_listbox.delete(0, tk.END)
+        self.frame_list_offset = 0
         
         if not self.flight_sequence or self.flight_sequence.get_frame_count() == 0:
             self.frame_info_label.config(text="No camera positions available")
             return
         
-        for i in range(self.flight_sequence.get_frame_count()):
+        frame_count = self.flight_sequence.get_frame_count()
+        self.frame_list_offset = max(0, min(center_frame - FRAME_LIST_WINDOW // 2, frame_count - FRAME_LIST_WINDOW))
+        last_frame = min(frame_count, self.frame_list_offset + FRAME_LIST_WINDOW)
+        for i in range(self.frame_list_offset, last_frame):
             params = self.flight_sequence.get_frame(i)
             if params:
                 frame_text = f"Frame {i+1:03d}: X={params[0]:8.1f} Y={params[1]:8.1f} Z={params[2]:8.1f} Yaw={params[3]:6.1f} Pitch={params[4]:6.1f} Roll={params[5]:6.1f}"
                 self.frame_listbox.insert(tk.END, frame_text)
     
-        self.frame_info_label.config(text=f"{self.flight_sequence.get_frame_count()} camera positions loaded")
+        if frame_count > FRAME_LIST_WINDOW:
+            self.frame_info_label.config(text=f"{frame_count} camera positions loaded (showing {self.frame_list_offset + 1}-{last_frame})")
+        else:
+            self.frame_info_label.config(text=f"{frame_count} camera positions loaded")
+
+    def _select_list_frame(self, frame_index):
+        """Select a frame in the listbox, moving the list window if it is outside it."""
+        if not self.frame_list_offset <= frame_index < self.frame_list_offset + self.frame_listbox.size():
+            self._populate_frame_list(frame_index)
+        row = frame_index - self.frame_list_offset
+        self.frame_listbox.selection_clear(0, tk.END)
+        self.frame_listbox.selection_set(row)
+        self.frame_listbox.see(row)  # Scroll to make it visible
 
     def on_frame_select(self, event):
         """Handle selection of a frame from the listbox."""
         selection = self.frame_listbox.curselection()
         if selection:
-            frame_index = selection[0]
+            frame_index = self.frame_list_offset + selection[0]
             self.current_frame_index.set(frame_index)
             
             # Update the slider position
@@ -354,6 +411,7 @@ class PanguClientApp(tk.Tk):
         if status:
             self.connection_status_label.config(text="✓ Connected to Pangu server")
             self.update_status("Connected successfully. Load a flight file to begin.")
+            self._start_filmstrip_fill()
         else:
             self.connection_status_label.config(text="✗ Connection failed")
             self.update_status(f"Connection failed: {msg}")
@@ -362,6 +420,7 @@ class PanguClientApp(tk.Tk):
 
     def do_disconnect(self):
         self.update_status("Disconnecting from server...")
+        self.filmstrip.stop()
         self.do_stop()
         if self.client:
             self.client.disconnect()
@@ -370,12 +429,15 @@ class PanguClientApp(tk.Tk):
         self._toggle_controls(False)
         self.display_image(None)
 
-    def do_update_euler(self, params=None, update_gui_entries=True):
+    def do_update_euler(self, params=None, update_gui_entries=True, frame_index=None):
         self.update_status("Requesting image with Euler angles...")
         try:
             if params is None:
                 params = [var.get() for var in self.euler_vars]
             image, msg = self.client.update_camera_euler(params)
+            if frame_index is not None:
+                # Before display_image, which shrinks the image in place
+                self.filmstrip.add_frame_image(frame_index, image)
             self.after(0, self.update_status, msg)
             self.after(0, self.display_image, image)
             if update_gui_entries:
@@ -413,10 +475,21 @@ class PanguClientApp(tk.Tk):
     def do_load_flight_file(self):
         filepath = filedialog.askopenfilename(
             title="Select a Flight Sequence File",
-            filetypes=[("Flight files", "*.fli"), ("Text files", "*.txt"), ("All files", "*.*")]
+            filetypes=[("Flight files", "*.fli *.flb"), ("Text files", "*.txt"), ("All files", "*.*")]
         )
         if not filepath: return
+        self._load_flight_sequence(filepath)
+
+    def do_open_catalog(self):
+        """Opens the flight catalog browser; double-clicking a flight loads it."""
+        CatalogDialog(self, on_open=self._load_flight_sequence)
+
+    def _load_flight_sequence(self, filepath):
+        # The filmstrip fill renders from the current sequence, so stop it before closing that.
+        self.filmstrip.stop()
         self.do_stop()
+        if self.flight_sequence:
+            self.flight_sequence.close()
         self.flight_sequence = FlightSequence(filepath)
         frame_count = self.flight_sequence.get_frame_count()
         if frame_count > 0:
@@ -424,10 +497,13 @@ class PanguClientApp(tk.Tk):
             self.frame_slider.config(to=frame_count - 1)
             self.current_frame_index.set(0)
             self._populate_frame_list()  # Populate the new list
+            self.filmstrip.load(self.flight_sequence)
+            self._start_filmstrip_fill()
             self.on_slider_drag()
         else:
             self.playback_status_label.config(text="Failed to load flight file.")
             self._populate_frame_list()  # Clear the list
+            self.filmstrip.load(None)
             messagebox.showerror("Load Error", "Could not parse any valid frames from the selected file.")
         self._update_playback_controls_state()
 
@@ -472,9 +548,8 @@ class PanguClientApp(tk.Tk):
         if params:
             self._update_euler_entries(params)
             # Update listbox selection to match slider
-            self.frame_listbox.selection_clear(0, tk.END)
-            self.frame_listbox.selection_set(frame_index)
-            self.frame_listbox.see(frame_index)  # Scroll to make it visible
+            self._select_list_frame(frame_index)
+            self.filmstrip.set_current_frame(frame_index)
             
         self.debounce_job = self.after(250, self._perform_slider_image_request)
 
@@ -484,7 +559,7 @@ class PanguClientApp(tk.Tk):
             frame_index = self.current_frame_index.get()
             params = self.flight_sequence.get_frame(frame_index)
             if params:
-                self.run_task(self.do_update_euler, params, update_gui_entries=False)
+                self.run_task(self.do_update_euler, params, update_gui_entries=False, frame_index=frame_index)
 
     def _playback_loop(self):
         while self.playback_running.is_set():
@@ -494,8 +569,9 @@ class PanguClientApp(tk.Tk):
             frame_idx = self.current_frame_index.get()
             if frame_idx >= self.flight_sequence.get_frame_count(): break
             params = self.flight_sequence.get_frame(frame_idx)
+            if params is None: break
             if self.client and self.client.is_connected:
-                self.do_update_euler(params, update_gui_entries=False)
+                self.do_update_euler(params, update_gui_entries=False, frame_index=frame_idx)
                 self.after(0, self._update_gui_for_playback, params, frame_idx + 1)
             try:
                 delay = 1.0 / self.playback_fps.get()
@@ -509,15 +585,46 @@ class PanguClientApp(tk.Tk):
         self._update_euler_entries(params)
         self.current_frame_index.set(next_frame_idx)
         # Update listbox selection during playback
-        self.frame_listbox.selection_clear(0, tk.END)
         if next_frame_idx < self.flight_sequence.get_frame_count():
-            self.frame_listbox.selection_set(next_frame_idx)
-            self.frame_listbox.see(next_frame_idx)
+            self._select_list_frame(next_frame_idx)
+            self.filmstrip.set_current_frame(next_frame_idx)
+        else:
+            self.frame_listbox.selection_clear(0, tk.END)
+
+    def _start_filmstrip_fill(self):
+        """Starts rendering missing filmstrip thumbnails whenever the server is otherwise idle."""
+        if self.client and self.client.is_connected and self.flight_sequence:
+            self.filmstrip.start_background_fill(self._render_filmstrip_frame, self._is_render_idle)
+
+    def _render_filmstrip_frame(self, frame_index):
+        if not self.client or not self.client.is_connected:
+            return None
+        params = self.flight_sequence.get_frame(frame_index)
+        if not params:
+            return None
+        image, _ = self.client.update_camera_euler(params)
+        return image
+
+    def _is_render_idle(self):
+        """Background renders only run when no live render is playing, pending or in flight."""
+        if not self.client or not self.client.is_connected:
+            return False
+        if self.playback_running.is_set() and not self.playback_paused.is_set():
+            return False
+        return self.debounce_job is None and not self.client.is_busy()
+
+    def on_filmstrip_select(self, frame_index):
+        """Jump to a frame clicked in the filmstrip."""
+        if self.playback_running.is_set() and not self.playback_paused.is_set():
+            return
+        self.current_frame_index.set(frame_index)
+        self.on_slider_drag()
 
     def on_closing(self):
         self.update_status("Closing application...")
         if self.debounce_job:
             self.after_cancel(self.debounce_job)
+        self.filmstrip.stop()
         self.do_stop()
         if self.client and self.client.is_connected:
             self.client.disconnect()
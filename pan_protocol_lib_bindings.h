@@ -9,4 +9,9 @@ void pan_protocol_set_viewpoint_by_angle(SOCKET, float, float, float, float, flo
 void pan_protocol_set_viewpoint_by_quaternion_s(SOCKET s, float x, float y, float z, float q0, float q1, float q2, float q3);
 void pan_protocol_set_field_of_view(SOCKET s, float f);
 unsigned char *pan_protocol_get_viewpoint_by_degrees_d(SOCKET, double, double, double, double, double, double, unsigned long *);
-unsigned char *pan_protocol_get_viewpoint_by_quaternion_s(SOCKET, float, float, float, float, float, float, float, unsigned long *);
\ No newline at end of file
+unsigned char *pan_protocol_get_viewpoint_by_quaternion_s(SOCKET, float, float, float, float, float, float, float, unsigned long *);
+
+char *pan_net_want(SOCKET, unsigned long);
+char *pan_net_get_image_TX(SOCKET, unsigned long *);
+char *pan_net_get_viewpoint_by_quaternion_s_TX(SOCKET, float, float, float, float, float, float, float);
+char *pan_net_get_viewpoint_by_degrees_d_TX(SOCKET, double, double, double, double, double, double);
\ No newline at end of file
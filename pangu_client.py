@@ -1,14 +1,17 @@
 import socket
 import logging
-import io
-from PIL import Image
+import threading
 from pan_protocol_wrapper import get_pan_library
+from frame_buffer_pool import FrameBufferPool, FrameReader
 
 logger = logging.getLogger(__name__)
 
+# Server message number for image replies (MSG_IMAGE in pan_protocol_lib.h).
+MSG_IMAGE = 2
+
 class PanguClient:
 
-    def __init__(self, ip, port):
+    def __init__(self, ip, port, buffer_pool=None, incremental_decode=False):
         self.server_ip = ip
         self.server_port = int(port)
         self.sock = None
@@ -16,6 +19,18 @@ class PanguClient:
         self.ffi = None
         self.sock_fd = -1
         self.is_connected = False
+        # Frame payloads are received into pooled buffers instead of
+        # a fresh native allocation per image.
+        self.buffer_pool = buffer_pool or FrameBufferPool()
+        self.incremental_decode = incremental_decode
+        self.frame_reader = None
+        # Serialises requests from the GUI, playback and background renders
+        # so replies on the shared socket cannot interleave.
+        self.request_lock = threading.Lock()
+
+    def is_busy(self):
+        """Returns True while an image request is in flight."""
+        return self.request_lock.locked()
 
     def connect(self):
         """Establishes a persistent connection to the Pangu server."""
@@ -30,6 +45,7 @@ class PanguClient:
             self.sock.connect(server_address)
             self.sock_fd = self.sock.fileno()
             self.lib.pan_protocol_start(self.sock_fd)
+            self.frame_reader = FrameReader(self.sock, self.buffer_pool, self.incremental_decode)
             self.is_connected = True
             logger.info(f'Connected successfully.')
             return True, "Connected successfully."
@@ -38,6 +54,7 @@ class PanguClient:
             logger.error(error_message)
             self.sock = None
             self.sock_fd = -1
+            self.frame_reader = None
             self.lib = None # Ensure lib is None on failure
             self.is_connected = False
             return False, error_message
@@ -46,57 +63,70 @@ class PanguClient:
         """Disconnects from the Pangu server."""
         if not self.is_connected:
             return
-            
-        if self.sock and self.lib:
-            try:
-                self.lib.pan_protocol_finish(self.sock_fd)
-                self.sock.close()
-                logger.info("Disconnected successfully.")
-            except Exception as e:
-                logger.error(f"Error during disconnection: {e}")
-        
-        self.sock = None
-        self.sock_fd = -1
-        self.is_connected = False
 
-    def _get_image_from_server(self, get_image_func, *args):
-       
+        # Wait for any request in flight so the goodbye is not interleaved with it.
+        with self.request_lock:
+            if not self.is_connected:
+                return
+            if self.sock and self.lib:
+                try:
+                    self.lib.pan_protocol_finish(self.sock_fd)
+                    self.sock.close()
+                    logger.info("Disconnected successfully.")
+                except Exception as e:
+                    logger.error(f"Error during disconnection: {e}")
+
+            self.sock = None
+            self.sock_fd = -1
+            self.frame_reader = None
+            self.is_connected = False
+
+    def _get_image_from_server(self, send_request_func, *args):
+        """
+        Sends an image request with one of the pan_net_*_TX functions and
+        reads the reply into a pooled buffer rather than letting the
+        library malloc() a new one for every frame.
+        """
         if not self.is_connected or not self.lib:
             return None, "Not connected to the server."
 
-        try:
-            size_ptr = self.ffi.new("unsigned long *")
-            logger.info(f'Requesting image with function {get_image_func.__name__}...')
-            image_ptr = get_image_func(self.sock_fd, *args, size_ptr)
-            
-            if image_ptr == self.ffi.NULL:
-                logger.error("Received NULL pointer for image.")
-                return None, "Failed to get image from server (received NULL)."
+        with self.request_lock:
+            if not self.is_connected:
+                return None, "Not connected to the server."
+            try:
+                logger.info(f'Requesting image with function {send_request_func.__name__}...')
+                error = send_request_func(self.sock_fd, *args)
+                if error != self.ffi.NULL:
+                    error_message = self.ffi.string(error).decode(errors='replace')
+                    logger.error(f"Failed to send image request: {error_message}")
+                    return None, f"Failed to send image request: {error_message}"
 
-            image_size = size_ptr[0]
-            if image_size == 0:
-                logger.warning("Received image with size 0.")
-                return None, "Received an empty image from server."
+                error = self.lib.pan_net_want(self.sock_fd, MSG_IMAGE)
+                if error != self.ffi.NULL:
+                    error_message = self.ffi.string(error).decode(errors='replace')
+                    logger.error(f"Server did not return an image: {error_message}")
+                    return None, f"Failed to get image from server: {error_message}"
 
-            image_data = self.ffi.buffer(image_ptr, image_size)[:]
-            logger.info(f'Got image of size {image_size} bytes.')
-            
-            image_stream = io.BytesIO(image_data)
-            image = Image.open(image_stream)
-            return image, "Image received successfully."
-        except Exception as e:
-            error_message = f'Error during image retrieval: {e}'
-            logger.error(error_message)
-            return None, error_message
+                image, image_size = self.frame_reader.read_image()
+                if image_size == 0:
+                    logger.warning("Received image with size 0.")
+                    return None, "Received an empty image from server."
+
+                logger.info(f'Got image of size {image_size} bytes.')
+                return image, "Image received successfully."
+            except Exception as e:
+                error_message = f'Error during image retrieval: {e}'
+                logger.error(error_message)
+                return None, error_message
 
     def get_image(self):
         """Gets an image using the current server camera settings."""
-        return self._get_image_from_server(self.lib.pan_protocol_get_image)
+        return self._get_image_from_server(self.lib.pan_net_get_image_TX, self.ffi.new("unsigned long *"))
 
     def update_camera_euler(self, params):
         """Sets camera viewpoint using Euler angles and gets an image."""
-        return self._get_image_from_server(self.lib.pan_protocol_get_viewpoint_by_degrees_d, *params)
+        return self._get_image_from_server(self.lib.pan_net_get_viewpoint_by_degrees_d_TX, *params)
 
     def update_camera_quaternion(self, params):
         """Sets camera viewpoint using a quaternion and gets an image."""
-        return self._get_image_from_server(self.lib.pan_protocol_get_viewpoint_by_quaternion_s, *params)
+        return self._get_image_from_server(self.lib.pan_net_get_viewpoint_by_quaternion_s_TX, *params)
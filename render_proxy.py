@@ -0,0 +1,323 @@
+import argparse
+import logging
+import socket
+import struct
+import threading
+from collections import OrderedDict, deque
+from pan_protocol_wrapper import get_pan_library
+
+logger = logging.getLogger(__name__)
+
+# PANGU encodes unsigned longs on the wire as 4 bytes in network byte order.
+ULONG = struct.Struct('>L')
+
+# Client message numbers (see pan_protocol_lib.h)
+MSG_GOODBYE = 0
+MSG_GET_IMAGE = 1
+MSG_GET_VIEWPOINT_BY_QUATERNION_S = 12
+MSG_GET_VIEWPOINT_BY_DEGREES_D = 16
+
+# Server message numbers
+MSG_IMAGE = 2
+
+# Number of argument bytes following each supported client message:
+# 7 floats for the quaternion request and 6 doubles for the Euler request.
+REQUEST_ARG_SIZES = {
+    MSG_GET_IMAGE: 0,
+    MSG_GET_VIEWPOINT_BY_QUATERNION_S: 7 * 4,
+    MSG_GET_VIEWPOINT_BY_DEGREES_D: 6 * 8,
+}
+
+
+def _capture_tx(func, *args):
+    """Returns the exact bytes a pan_protocol_* function writes to its socket."""
+    tx, rx = socket.socketpair()
+    try:
+        func(tx.fileno(), *args)
+        # On Windows socketpair() is a loopback TCP pair, so the bytes may
+        # still be in transit; read until EOF rather than until empty.
+        tx.shutdown(socket.SHUT_WR)
+        data = bytearray()
+        while True:
+            chunk = rx.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+        return bytes(data)
+    finally:
+        tx.close()
+        rx.close()
+
+
+def _recv_exact(sock, size):
+    """Reads exactly size bytes from sock, raising ConnectionError if it closes early."""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError(f"Connection closed after {received} of {size} bytes.")
+        received += n
+    return buf
+
+
+class _RenderJob:
+    """A single upstream render shared by every downstream request with the same key."""
+    def __init__(self, key, request):
+        self.key = key
+        self.request = request
+        self.payload = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class FairRenderQueue:
+    """
+    Queues render jobs per downstream client and hands them out round-robin,
+    so one client sending a long batch cannot starve the others. Requests
+    identical to one that is already queued or in flight share its job.
+    """
+    def __init__(self):
+        self._queues = OrderedDict()
+        self._in_flight = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rendered = 0
+
+    def submit(self, client_id, request):
+        """Returns the job that will render request, reusing an in-flight one if possible."""
+        with self._cond:
+            self.submitted += 1
+            job = self._in_flight.get(request)
+            if job is not None:
+                self.deduplicated += 1
+                return job
+            job = _RenderJob(request, request)
+            self._in_flight[job.key] = job
+            self._queues.setdefault(client_id, deque()).append(job)
+            self._cond.notify()
+            return job
+
+    def take(self):
+        """Blocks until a job is available and returns it, or None once the queue is closed."""
+        with self._cond:
+            while not self._queues:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            client_id, queue = self._queues.popitem(last=False)
+            job = queue.popleft()
+            if queue:
+                # Move the client to the back of the round-robin order
+                self._queues[client_id] = queue
+            return job
+
+    def finish(self, job, payload=None, error=None):
+        """Publishes the result of a job to all of its waiters."""
+        with self._cond:
+            self._in_flight.pop(job.key, None)
+            if payload is not None:
+                self.rendered += 1
+        job.payload = payload
+        job.error = error
+        job.done.set()
+
+    def close(self):
+        """Wakes up all workers and fails jobs that have not started yet."""
+        with self._cond:
+            self._closed = True
+            pending = [job for queue in self._queues.values() for job in queue]
+            self._queues.clear()
+            self._cond.notify_all()
+        for job in pending:
+            self.finish(job, error="Proxy is shutting down.")
+
+
+class _UpstreamConnection:
+    """A connection from the proxy to the real PANGU server."""
+    def __init__(self, host, port, start_bytes, finish_bytes):
+        self.host = host
+        self.port = port
+        self.start_bytes = start_bytes
+        self.finish_bytes = finish_bytes
+        self.sock = None
+
+    def _connect(self):
+        logger.info(f"Opening upstream connection to {self.host}:{self.port}")
+        self.sock = socket.create_connection((self.host, self.port))
+        self.sock.sendall(self.start_bytes)
+
+    def render(self, request):
+        """Sends a raw image request and returns the image payload."""
+        if self.sock is None:
+            self._connect()
+        try:
+            self.sock.sendall(request)
+            reply = ULONG.unpack(_recv_exact(self.sock, ULONG.size))[0]
+            if reply != MSG_IMAGE:
+                raise RuntimeError(f"Upstream replied with message {reply} instead of an image.")
+            size = ULONG.unpack(_recv_exact(self.sock, ULONG.size))[0]
+            return _recv_exact(self.sock, size)
+        except Exception:
+            # The stream position is unknown after a failure, so start afresh next time.
+            self.close(send_goodbye=False)
+            raise
+
+    def close(self, send_goodbye=True):
+        if self.sock is None:
+            return
+        try:
+            if send_goodbye:
+                self.sock.sendall(self.finish_bytes)
+            self.sock.close()
+        except OSError as e:
+            logger.warning(f"Error closing upstream connection: {e}")
+        self.sock = None
+
+
+class RenderProxy:
+    """
+    A local proxy that speaks the PANGU image protocol to many downstream
+    clients and multiplexes their requests onto at most max_upstreams
+    connections to the real server. Identical in-flight viewpoint requests
+    are rendered once and requests are served fairly across clients.
+
+    Only GetImage, GetViewpointByQuaternionS and GetViewpointByDegreesD are
+    supported, and GetImage only after a viewpoint request. Any other
+    message, or an upstream error, closes the downstream connection.
+    """
+    def __init__(self, listen_host, listen_port, upstream_host, upstream_port, max_upstreams=2):
+        self.listen_address = (listen_host, int(listen_port))
+        self.upstream_address = (upstream_host, int(upstream_port))
+        self.max_upstreams = max_upstreams
+        self.queue = FairRenderQueue()
+        self._server_sock = None
+        self._running = threading.Event()
+        self._threads = []
+        self._next_client_id = 0
+
+        lib, _ = get_pan_library()
+        self.start_bytes = _capture_tx(lib.pan_protocol_start)
+        self.finish_bytes = _capture_tx(lib.pan_protocol_finish)
+
+    def serve_forever(self):
+        """Accepts downstream clients until shutdown() is called."""
+        self._server_sock = socket.create_server(self.listen_address)
+        # Wake up regularly so Ctrl+C is delivered; on Windows a blocking
+        # accept() only returns once a client connects.
+        self._server_sock.settimeout(1.0)
+        self._running.set()
+        logger.info(f"Render proxy listening on {self.listen_address[0]}:{self.listen_address[1]}, "
+                    f"forwarding to {self.upstream_address[0]}:{self.upstream_address[1]} "
+                    f"with {self.max_upstreams} upstream connection(s).")
+
+        for _ in range(self.max_upstreams):
+            worker = threading.Thread(target=self._upstream_loop)
+            worker.daemon = True
+            worker.start()
+            self._threads.append(worker)
+
+        while self._running.is_set():
+            try:
+                conn, address = self._server_sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self._next_client_id += 1
+            handler = threading.Thread(target=self._handle_client, args=(conn, address, self._next_client_id))
+            handler.daemon = True
+            handler.start()
+
+    def shutdown(self):
+        """Stops accepting clients and closes the upstream connections."""
+        self._running.clear()
+        if self._server_sock:
+            self._server_sock.close()
+        self.queue.close()
+        for worker in self._threads:
+            worker.join(timeout=1.0)
+        logger.info(f"Render proxy stopped: {self.queue.submitted} requests, "
+                    f"{self.queue.deduplicated} deduplicated, {self.queue.rendered} upstream renders.")
+
+    def _upstream_loop(self):
+        upstream = _UpstreamConnection(*self.upstream_address, self.start_bytes, self.finish_bytes)
+        try:
+            while True:
+                job = self.queue.take()
+                if job is None:
+                    return
+                try:
+                    payload = upstream.render(job.request)
+                    self.queue.finish(job, payload=payload)
+                except Exception as e:
+                    logger.error(f"Upstream render failed: {e}")
+                    self.queue.finish(job, error=str(e))
+        finally:
+            upstream.close()
+
+    def _handle_client(self, conn, address, client_id):
+        logger.info(f"Client {client_id} connected from {address[0]}:{address[1]}")
+        # GetImage renders from the client's own last viewpoint, which the
+        # shared upstream connections do not remember, so it is replayed.
+        # Without one it would return another client's camera, so it is refused.
+        last_viewpoint = None
+        try:
+            handshake = bytes(_recv_exact(conn, len(self.start_bytes)))
+            if handshake != self.start_bytes:
+                raise RuntimeError("Unexpected protocol start message.")
+
+            while self._running.is_set():
+                message = ULONG.unpack(_recv_exact(conn, ULONG.size))[0]
+                if message == MSG_GOODBYE:
+                    break
+                if message not in REQUEST_ARG_SIZES:
+                    raise RuntimeError(f"Unsupported message {message}.")
+                request = ULONG.pack(message) + bytes(_recv_exact(conn, REQUEST_ARG_SIZES[message]))
+
+                if message == MSG_GET_IMAGE:
+                    if last_viewpoint is None:
+                        raise RuntimeError("GetImage before any viewpoint request is not supported by the proxy.")
+                    job = self.queue.submit(client_id, last_viewpoint)
+                else:
+                    last_viewpoint = request
+                    job = self.queue.submit(client_id, request)
+
+                job.done.wait()
+                if job.error:
+                    raise RuntimeError(job.error)
+                conn.sendall(ULONG.pack(MSG_IMAGE) + ULONG.pack(len(job.payload)))
+                conn.sendall(job.payload)
+        except (ConnectionError, RuntimeError) as e:
+            logger.warning(f"Client {client_id}: {e}")
+        except OSError as e:
+            logger.error(f"Client {client_id} socket error: {e}")
+        finally:
+            conn.close()
+            logger.info(f"Client {client_id} disconnected.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share PANGU server connections between many local clients.")
+    parser.add_argument('--listen', default='127.0.0.1:10364', help="host:port to accept clients on")
+    parser.add_argument('--upstream', default='127.0.0.1:10363', help="host:port of the PANGU server")
+    parser.add_argument('--upstreams', type=int, default=2, help="maximum number of connections to the PANGU server")
+    args = parser.parse_args()
+
+    listen_host, listen_port = args.listen.rsplit(':', 1)
+    upstream_host, upstream_port = args.upstream.rsplit(':', 1)
+    proxy = RenderProxy(listen_host, listen_port, upstream_host, upstream_port, max(1, args.upstreams))
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.shutdown()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()